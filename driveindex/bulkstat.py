@@ -0,0 +1,128 @@
+"""
+Directory listing through macOS getattrlistbulk(2), which returns the names,
+types and sizes of many directory entries per syscall instead of needing one
+stat() per file.
+
+bulk_listdir is None on other platforms, and on macOS releases whose libc
+does not provide getattrlistbulk (10.9 and earlier).
+"""
+
+from typing import Callable, List, Optional, Tuple
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+
+# --- <sys/attr.h> ---
+ATTR_BIT_MAP_COUNT = 5
+ATTR_CMN_NAME = 0x00000001
+ATTR_CMN_OBJTYPE = 0x00000008
+ATTR_CMN_RETURNED_ATTRS = 0x80000000
+ATTR_FILE_DATALENGTH = 0x00000200
+
+# --- fsobj_type_t values (enum vtype in <sys/vnode.h>) ---
+VREG = 1
+VDIR = 2
+
+BUFFER_SIZE = 64 * 1024
+
+# Every returned entry starts with its length, the attribute_set_t of the
+# attributes actually returned, the name's attrreference_t (offset relative to
+# the reference itself, length including the NUL) and the object type. Regular
+# files are followed by their data length (st_size). Fields are 4-byte aligned.
+ENTRY_HEADER = struct.Struct("=I5IiII")
+NAME_REF_OFFSET = 24
+DATA_LENGTH = struct.Struct("=q")
+
+Listing = Tuple[List[Tuple[str, int]], List[str]]
+
+
+class AttrList(ctypes.Structure):
+    """struct attrlist"""
+
+    _fields_ = [
+        ("bitmapcount", ctypes.c_ushort),
+        ("reserved", ctypes.c_uint16),
+        ("commonattr", ctypes.c_uint32),
+        ("volattr", ctypes.c_uint32),
+        ("dirattr", ctypes.c_uint32),
+        ("fileattr", ctypes.c_uint32),
+        ("forkattr", ctypes.c_uint32),
+    ]
+
+
+REQUESTED_ATTRS = AttrList(
+    bitmapcount=ATTR_BIT_MAP_COUNT,
+    commonattr=ATTR_CMN_RETURNED_ATTRS | ATTR_CMN_NAME | ATTR_CMN_OBJTYPE,
+    fileattr=ATTR_FILE_DATALENGTH,
+)
+
+
+# --------------------------------------------------
+def getattrlistbulk_listdir(dir_fd: int) -> Listing:
+    """
+    List the directory open as dir_fd, returning (name, size) for its regular
+    files and the names of its subdirectories. Symlinks and other file types
+    are skipped.
+    """
+
+    files: List[Tuple[str, int]] = []
+    subdirs: List[str] = []
+    buf = ctypes.create_string_buffer(BUFFER_SIZE)
+
+    while True:
+        count = getattrlistbulk(
+            dir_fd, ctypes.byref(REQUESTED_ATTRS), buf, BUFFER_SIZE, 0
+        )
+        if count == 0:
+            break
+        if count < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        unpack_entries(buf, count, files, subdirs)
+
+    return files, subdirs
+
+
+# --------------------------------------------------
+def unpack_entries(
+    buf: ctypes.Array, count: int, files: List[Tuple[str, int]], subdirs: List[str]
+):
+    """Decode count packed entries from a getattrlistbulk buffer."""
+
+    offset = 0
+    for _ in range(count):
+        (length, _, _, _, fileattr, _, name_offset, name_length, objtype) = (
+            ENTRY_HEADER.unpack_from(buf, offset)
+        )
+        name_start = offset + NAME_REF_OFFSET + name_offset
+        name = os.fsdecode(buf[name_start : name_start + name_length - 1])
+
+        if objtype == VDIR:
+            subdirs.append(name)
+        elif objtype == VREG and fileattr & ATTR_FILE_DATALENGTH:
+            (size,) = DATA_LENGTH.unpack_from(buf, offset + ENTRY_HEADER.size)
+            files.append((name, size))
+
+        offset += length
+
+
+bulk_listdir: Optional[Callable[[int], Listing]] = None
+
+if sys.platform == "darwin":
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        getattrlistbulk = libc.getattrlistbulk
+    except (OSError, AttributeError):
+        pass  # Fall back to os.scandir.
+    else:
+        getattrlistbulk.argtypes = [
+            ctypes.c_int,
+            ctypes.POINTER(AttrList),
+            ctypes.c_void_p,
+            ctypes.c_size_t,
+            ctypes.c_uint64,
+        ]
+        getattrlistbulk.restype = ctypes.c_int
+        bulk_listdir = getattrlistbulk_listdir
@@ -14,46 +14,105 @@ Purpose:
 
 __version__ = "0.1.1"
 
-from typing import TypedDict, List
-from wcwidth import wcswidth  # type: ignore[import]
-from ansi import colorize, BRIGHT_CYAN, BRIGHT_BLUE, GRAY_40
-import json
+from typing import (
+    Any,
+    BinaryIO,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from concurrent.futures import Future, ThreadPoolExecutor
+from wcwidth import wcwidth  # type: ignore[import]
+from ansi import BRIGHT_CYAN, BRIGHT_BLUE, GRAY_40, RESET
+from bulkstat import bulk_listdir, Listing
+import msgspec
 import argparse
+import contextlib
+import errno
+import functools
+import io
 import logging
 import os
+import queue
 import sys
 import unicodedata
 
+try:
+    # ijson selects its C (yajl2_c) backend by itself when available.
+    import ijson  # type: ignore[import]
+except ImportError:
+    ijson = None  # Legacy array indexes are then parsed in one piece.
 
-# --- Type hint ---
-class DirectoryMeta(TypedDict):
+try:
+    import zstandard  # type: ignore[import]
+except ImportError:
+    zstandard = None  # Only needed for .zst indexes.
+
+
+# --- Index records ---
+class DirectoryMeta(msgspec.Struct):
     name: str
     file_count: int
+    key: str = msgspec.field(name="_key")  # search_key(name)
 
 
-class FileMeta(TypedDict):
-    name: str
-    size: int
+class FileColumns(msgspec.Struct):
+    # Parallel arrays, one element per file.
+    names: List[str]
+    sizes: List[int]
+    keys: List[str]  # search_key(name)
 
 
-class DirectoryInfo(TypedDict):
+class DirectoryInfo(msgspec.Struct):
     path: str
     directory: DirectoryMeta
-    files: List[FileMeta]
+    files: FileColumns
+
+
+class IndexHeader(msgspec.Struct):
+    version: int
 
 
-IGNORED_FILES = {
-    ".DS_Store",
-    ".com.apple.timemachine.donotpresent",
-}
+IGNORED_FILES = frozenset(
+    {
+        ".DS_Store",
+        ".com.apple.timemachine.donotpresent",
+    }
+)
 
-IGNORED_DIRS = {
-    ".fseventsd",
-}
+IGNORED_DIRS = frozenset(
+    {
+        ".fseventsd",
+    }
+)
 
 
+# Directory reads are I/O bound, so threads overlap the syscalls.
+SCAN_WORKERS = 8
+SCANDIR_FD = os.scandir in os.supports_fd
+DIR_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+
+# The index is JSON Lines: a {"version": ...} header, then one DirectoryInfo
+# per line, so scans append and searches stream.
+# Version 2 added the precomputed "_key" search keys; version 3 stores each
+# directory's files as parallel name/size/key arrays.
+INDEX_VERSION = 3
+
+# Index paths ending in .zst are zstd-compressed at this level.
+ZSTD_LEVEL = 3
+
+JSON_ENCODER = msgspec.json.Encoder()
+HEADER_DECODER = msgspec.json.Decoder(IndexHeader)
+ENTRY_DECODER = msgspec.json.Decoder(DirectoryInfo)
+
 MAX_FILENAME_WIDTH = 100
 MAX_SIZE_WIDTH = 10
+OUTPUT_CHUNK_SIZE = 64 * 1024
 
 
 # --------------------------------------------------
@@ -80,7 +139,7 @@ def get_args():
         metavar="OUTPUT_JSON",
         type=str,
         nargs="?",
-        help="path to save the generated JSON index",
+        help="path to save the generated JSON index (compressed if it ends in .zst)",
         default="contents.json",
     )
 
@@ -103,6 +162,19 @@ def get_args():
         help="keyword to search for (partial match supported)",
     )
 
+    # ---- Dump subcommand ----
+    dump_parser = subparsers.add_parser(
+        "dump", help="print an existing index as indented JSON"
+    )
+    dump_parser.add_argument(
+        "filename",
+        metavar="INPUT_JSON",
+        type=str,
+        nargs="?",
+        help="path to the existing JSON index file",
+        default="contents.json",
+    )
+
     return parser.parse_args()
 
 
@@ -117,6 +189,8 @@ def main():
         handle_scan(args.filename)
     elif args.command == "search":
         handle_search(args.filename, args.keyword)
+    elif args.command == "dump":
+        handle_dump(args.filename)
 
 
 # --------------------------------------------------
@@ -157,110 +231,305 @@ def handle_scan(output_path: str):
             else:
                 print(f"Please enter a number between 1 and {len(volumes)}.")
 
-    results: List[DirectoryInfo] = []
-
     if os.path.exists(output_path):
         try:
-            with open(output_path, "r", encoding="utf-8") as fh:
-                existing_data = json.load(fh)
-                results.extend(existing_data)  # Add existing data.
-            logging.info(f"Existing index loaded from: {output_path}")
-        except json.JSONDecodeError:
+            with open_index(output_path) as fh:
+                version = index_version(fh.readline())
+            if version != INDEX_VERSION:
+                rewrite_index(output_path)
+                logging.info(f"Existing index upgraded: {output_path}")
+            else:
+                logging.info(f"Appending to existing index: {output_path}")
+        except msgspec.ValidationError as e:
+            logging.error(f"Failed to load index JSON file: {e}")
+            sys.exit(1)
+        except msgspec.DecodeError:
             logging.info(
                 f"'{output_path}': invalid JSON format. Starting with a new index."
             )
+            os.remove(output_path)
         except Exception as e:
             logging.error(f"Failed to load index JSON file: {e}")
             sys.exit(1)
 
-    for dirpath, dirnames, filenames in os.walk(drive_path):
-        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+    try:
+        with open(output_path, "ab") as raw:
+            start = raw.tell()
+            try:
+                with index_writer(raw, output_path) as fh:
+                    if start == 0:
+                        fh.write(dumps_json(IndexHeader(INDEX_VERSION)) + b"\n")
+                    for entry in walk_drive(drive_path):
+                        fh.write(dumps_json(entry) + b"\n")
+            except BaseException:
+                raw.truncate(start)  # Drop a partially appended scan.
+                raise
+        logging.info(f"Index saved to: {output_path}")
+    except Exception as e:
+        logging.error(f"Failed to save JSON file: {e}")
+        sys.exit(1)
 
-        valid_filenames = [f for f in filenames if f not in IGNORED_FILES]
-        if not valid_filenames:
-            continue  # Skip directories with no valid files.
 
-        directory_meta: DirectoryMeta = {
-            "name": os.path.basename(dirpath),
-            "file_count": len(valid_filenames),
-        }
+# --------------------------------------------------
+def handle_search(index_path: str, keyword: str):
+    """Search index JSON for directories or files containing the keyword."""
 
-        directory_info: DirectoryInfo = {
-            "path": os.path.abspath(dirpath),
-            "directory": directory_meta,
-            "files": [],
-        }
+    results: List[DirectoryInfo] = []
+    kw = search_key(keyword)
 
-        for filename in valid_filenames:
-            file_path = os.path.join(dirpath, filename)
-            try:
-                file_size = os.path.getsize(file_path)
-            except OSError:
-                continue  # Ignore inaccessible files.
+    try:
+        with open_index(index_path) as fh:
+            for entry in iter_index(fh):
+                if kw in entry.directory.key:
+                    results.append(entry)
+                    continue
+
+                files = entry.files
+                keys = files.keys
+                # One C-level search over the joined keys rules out most
+                # directories; names cannot contain NUL, so a hit never
+                # straddles two keys.
+                if kw not in "\0".join(keys):
+                    continue
+
+                matched = [i for i, k in enumerate(keys) if kw in k]
+                names, sizes = files.names, files.sizes
+                matched.sort(key=lambda i: names[i].lower())
+                entry.files = FileColumns(
+                    names=[names[i] for i in matched],
+                    sizes=[sizes[i] for i in matched],
+                    keys=[keys[i] for i in matched],
+                )
+                results.append(entry)
+    except Exception as e:
+        logging.error(f"Failed to load index JSON file: {e}")
+        sys.exit(1)
 
-            directory_info["files"].append({"name": filename, "size": file_size})
+    if not results:
+        print(f"No results found for: '{keyword}'")
+        return
+
+    results.sort(key=lambda e: e.directory.name.lower())
 
-        results.append(directory_info)
+    # Only color the output for a terminal; pipes and files get plain text.
+    if sys.stdout.isatty():
+        cyan, blue, gray, reset = BRIGHT_CYAN, BRIGHT_BLUE, GRAY_40, RESET
+    else:
+        cyan = blue = gray = reset = ""
+
+    # Bind the hot-loop constants to locals once.
+    reset_nl = reset + "\n"
+    name_width, size_width = MAX_FILENAME_WIDTH, MAX_SIZE_WIDTH
+
+    # Rows are joined and encoded once per directory into a byte buffer that
+    # goes straight to the stdout fd in OUTPUT_CHUNK_SIZE pieces, bypassing
+    # the per-call text layer.
+    encoding, errors = sys.stdout.encoding, sys.stdout.errors
+    stdout_fd = sys.stdout.fileno()
+    sys.stdout.flush()
+    out = bytearray()
+    buf: List[str] = []
+    append = buf.append
 
     try:
-        with open(output_path, "w", encoding="utf-8") as fh:
-            json.dump(results, fh, indent=4, ensure_ascii=False)
-        logging.info(f"Index saved to: {output_path}")
-    except Exception as e:
-        logging.error(f"Failed to save JSON file: {e}")
-        sys.exit(1)
+        for result in results:
+            append(
+                f"<Directory '{cyan}{result.directory.name}{reset}' "
+                f"has {result.directory.file_count} file(s).> "
+                f"{blue}{extract_volume_name(result.path)}{reset}\n"
+            )
+            even_number_cell = False
+            files = result.files
+            for name, size in zip(files.names, files.sizes):
+                cell_str = (
+                    f"\t{pad_to_width(name, name_width)}"
+                    f"{human_readable_size(size):>{size_width}}"
+                )
+                ## Use light gray for even rows.
+                if even_number_cell:
+                    append(gray)
+                    append(cell_str)
+                    append(reset_nl)
+                else:
+                    append(cell_str)
+                    append("\n")
+                even_number_cell = not even_number_cell
+
+            out += "".join(buf).encode(encoding, errors)
+            buf.clear()
+            if len(out) >= OUTPUT_CHUNK_SIZE:
+                write_all(stdout_fd, out)
+                out.clear()
+
+        write_all(stdout_fd, out)
+    except BrokenPipeError:
+        sys.exit(1)  # The reader went away (e.g. piped into head).
 
 
 # --------------------------------------------------
-def handle_search(index_path: str, keyword: str):
-    """Search index JSON for directories or files containing the keyword."""
+def handle_dump(index_path: str):
+    """
+    Print an index as one indented JSON array. The index itself is stored
+    compact; this is for reading or diffing it.
+    """
 
+    out = sys.stdout.buffer
     try:
-        with open(index_path, "r", encoding="utf-8") as fh:
-            index: List[DirectoryInfo] = json.load(fh)
+        with open_index(index_path) as fh:
+            out.write(b"[")
+            separator = b"\n"
+            for entry in iter_index(fh):
+                out.write(separator)
+                out.write(dumps_json(entry, pretty=True))
+                separator = b",\n"
+            out.write(b"\n]\n")
+            out.flush()
+    except BrokenPipeError:
+        # The reader went away; keep the interpreter's final flush quiet too.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+        sys.exit(1)
     except Exception as e:
         logging.error(f"Failed to load index JSON file: {e}")
         sys.exit(1)
 
-    results: List[DirectoryInfo] = []
 
-    for entry in index:
-        directory_name = normalize(entry["directory"]["name"]).lower()
-        files = entry["files"]
+# --------------------------------------------------
+def walk_drive(drive_path: str) -> Iterator[DirectoryInfo]:
+    """
+    Walk a drive with a pool of worker threads, yielding the info of each
+    directory that contains files as soon as it has been scanned.
+    """
 
-        if keyword in directory_name:
-            results.append(entry)
-            continue
+    # Resolve the root once; every path below it is then already absolute.
+    drive_path = os.path.abspath(drive_path)
 
-        if matched := [
-            f for f in files if keyword.lower() in normalize(f["name"]).lower()
-        ]:
-            matched.sort(key=lambda f: f["name"].lower())
-            entry["files"] = matched
-            results.append(entry)
+    # Finished scans are queued by their done callbacks, so each completion
+    # costs O(1) instead of a wait() over every outstanding future.
+    done: "queue.SimpleQueue[Future]" = queue.SimpleQueue()
+    executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS)
+    try:
+        executor.submit(scan_directory, drive_path).add_done_callback(done.put)
+        outstanding = 1
+        while outstanding:
+            directory_info, subdirs = done.get().result()
+            outstanding -= 1
+            for subdir in subdirs:
+                executor.submit(scan_directory, subdir).add_done_callback(done.put)
+            outstanding += len(subdirs)
+            if directory_info is not None:
+                yield directory_info
+    finally:
+        # On an abort (Ctrl-C, or the consumer closing the generator), drop the
+        # queued directories instead of scanning them all before returning.
+        executor.shutdown(wait=True, cancel_futures=True)
 
-    if not results:
-        print(f"No results found for: '{keyword}'")
-        return
 
-    results.sort(key=lambda e: e["directory"]["name"].lower())
+# --------------------------------------------------
+def scan_directory(dirpath: str) -> Tuple[Optional[DirectoryInfo], List[str]]:
+    """
+    Read a single directory by its absolute path, returning its info (None
+    when it has no valid files) and the paths of the subdirectories still to
+    be scanned.
+    """
 
-    for result in results:
-        print(
-            f"<Directory '{colorize(result['directory']['name'], BRIGHT_CYAN)}' "
-            f"has {result['directory']['file_count']} file(s).> "
-            f"{colorize(extract_volume_name(result['path']), BRIGHT_BLUE)}"
-        )
-        even_number_cell = False
-        for file in result["files"]:
-            cell_str = (
-                "\t"
-                + pad_to_width(file["name"], MAX_FILENAME_WIDTH)
-                + human_readable_size(file["size"]).rjust(MAX_SIZE_WIDTH)
+    try:
+        # Scanning through a directory fd makes every DirEntry.stat() an
+        # fstatat() relative to it, so the kernel does not re-resolve the
+        # full path for each file.
+        dir_fd = os.open(dirpath, DIR_OPEN_FLAGS) if SCANDIR_FD else None
+    except OSError:
+        return None, []  # Ignore unreadable directories, as os.walk did.
+
+    try:
+        if dir_fd is not None and bulk_listdir is not None:
+            # On macOS, getattrlistbulk(2) returns the names, types and sizes
+            # of many entries per call, so no per-file stat is needed.
+            try:
+                file_entries, dir_names = bulk_listdir(dir_fd)
+            except OSError as e:
+                if e.errno in (errno.EACCES, errno.ENOENT):
+                    raise
+                # The volume's filesystem may not support getattrlistbulk, so
+                # list the directory again from the start through scandir.
+                os.lseek(dir_fd, 0, os.SEEK_SET)
+                file_entries, dir_names = scandir_listdir(dir_fd)
+        else:
+            file_entries, dir_names = scandir_listdir(
+                dirpath if dir_fd is None else dir_fd
             )
-            ## Use light gray for even rows.
-            print(colorize(cell_str, GRAY_40) if even_number_cell else cell_str)
-            even_number_cell = not even_number_cell
+    except OSError:
+        return None, []  # Ignore unreadable directories, as os.walk did.
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    prefix = dirpath + os.sep
+    subdirs = [prefix + name for name in dir_names if name not in IGNORED_DIRS]
+    names: List[str] = []
+    sizes: List[int] = []
+    for name, size in file_entries:
+        if name not in IGNORED_FILES:
+            names.append(name)
+            sizes.append(size)
+
+    if not names:
+        return None, subdirs  # Skip directories with no valid files.
+
+    files = FileColumns(
+        names=names,
+        sizes=sizes,
+        keys=[search_key(name) for name in names],
+    )
+
+    dirname = os.path.basename(dirpath)
+    directory_meta = DirectoryMeta(
+        name=dirname,
+        file_count=len(names),
+        key=search_key(dirname),
+    )
+
+    directory_info = DirectoryInfo(
+        path=dirpath,
+        directory=directory_meta,
+        files=files,
+    )
+
+    return directory_info, subdirs
+
+
+# --------------------------------------------------
+def scandir_listdir(path: Union[str, int]) -> Listing:
+    """
+    List a directory with os.scandir, returning (name, size) for its regular
+    files and the names of its subdirectories. Symlinks are skipped.
+    """
+
+    files: List[Tuple[str, int]] = []
+    subdirs: List[str] = []
+
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    # DirEntry caches the stat result, so no second syscall.
+                    file_size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue  # Ignore inaccessible files.
+                files.append((entry.name, file_size))
+
+    return files, subdirs
+
+
+# --------------------------------------------------
+def write_all(fd: int, data: bytearray):
+    """Write all of data to a file descriptor, retrying on partial writes."""
+
+    with memoryview(data) as view:
+        written = 0
+        while written < len(view):
+            written += os.write(fd, view[written:])
 
 
 # --------------------------------------------------
@@ -277,10 +546,12 @@ def extract_volume_name(path: str) -> str:
 
 
 # --------------------------------------------------
+@functools.lru_cache(maxsize=4096)
 def human_readable_size(size_bytes: int) -> str:
     """
     Convert a file size in bytes to a human-readable string
-    using KB, MB, GB, TB, or PB units.
+    using KB, MB, GB, TB, or PB units. Results are cached, since many
+    files share the same size.
     """
 
     if size_bytes < 1024:
@@ -297,19 +568,25 @@ def human_readable_size(size_bytes: int) -> str:
 def pad_to_width(text: str, width: int) -> str:
     """Truncate or pad a string to fit a given display width."""
 
-    text_width = wcswidth(text)
+    # Fast path: printable ASCII is one column per character.
+    if text.isascii() and text.isprintable():
+        if len(text) <= width:
+            return text + " " * (width - len(text))
+        return text[: width - 3] + "..."
+
+    text_width = sum(map(char_width, text))
     if text_width <= width:
         # Pad with spaces
         return text + " " * (width - text_width)
 
     # Need to truncate
     ellipsis = "..."
-    ellipsis_width = wcswidth(ellipsis)
+    ellipsis_width = len(ellipsis)
     truncated = ""
     current_width = 0
 
     for ch in text:
-        ch_w = wcswidth(ch)
+        ch_w = char_width(ch)
         if current_width + ch_w + ellipsis_width > width:
             break
         truncated += ch
@@ -318,6 +595,189 @@ def pad_to_width(text: str, width: int) -> str:
     return truncated + ellipsis + " " * (width - (current_width + ellipsis_width))
 
 
+# Display widths of the non-ASCII characters seen so far.
+CHAR_WIDTHS: Dict[str, int] = {}
+
+
+# --------------------------------------------------
+def char_width(ch: str) -> int:
+    """
+    Return the display width of a single character. Printable ASCII is
+    always 1 column; other characters are looked up once and cached.
+    """
+
+    if " " <= ch <= "~":
+        return 1
+    ch_w = CHAR_WIDTHS.get(ch)
+    if ch_w is None:
+        # Non-printable characters report -1; count them as zero width.
+        ch_w = CHAR_WIDTHS[ch] = max(wcwidth(ch), 0)
+    return ch_w
+
+
+# --------------------------------------------------
+def dumps_json(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize an object to compact, single-line UTF-8 JSON (indented when
+    pretty is set).
+    """
+
+    data = JSON_ENCODER.encode(obj)
+    return msgspec.json.format(data, indent=2) if pretty else data
+
+
+# --------------------------------------------------
+def loads_json(data: bytes) -> Any:
+    """Deserialize UTF-8 JSON into plain Python objects."""
+
+    return msgspec.json.decode(data)
+
+
+# --------------------------------------------------
+def index_version(first_line: bytes) -> int:
+    """
+    Return the format version recorded in the header line of an index file,
+    or 0 for the single JSON array written before JSON Lines.
+    """
+
+    if first_line.lstrip().startswith(b"["):
+        return 0
+    return HEADER_DECODER.decode(first_line).version
+
+
+# --------------------------------------------------
+def iter_index(fh: BinaryIO) -> Iterator[DirectoryInfo]:
+    """Yield the directory entries of an index file opened in binary mode."""
+
+    first_line = fh.readline()
+    version = index_version(first_line)
+    if version > INDEX_VERSION:
+        raise ValueError(f"unsupported index version: {version}")
+
+    lines = (line for line in fh if line.strip())
+    if version == INDEX_VERSION:
+        # Decode straight into the record structs, skipping plain dicts.
+        yield from map(ENTRY_DECODER.decode, lines)
+        return
+
+    entries: Iterable[Dict[str, Any]]
+    if version > 0:
+        entries = map(loads_json, lines)
+    elif ijson is not None and fh.seekable():
+        fh.seek(0)
+        entries = ijson_items(fh)
+    else:
+        entries = loads_json(first_line + fh.read())
+
+    yield from map(upgrade_entry, entries)
+
+
+# --------------------------------------------------
+def ijson_items(fh: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the elements of a legacy JSON array index, raising parse errors as
+    msgspec.DecodeError so they are handled the same as without ijson.
+    """
+
+    try:
+        yield from ijson.items(fh, "item")
+    except ijson.JSONError as e:
+        raise msgspec.DecodeError(str(e)) from e
+
+
+# --------------------------------------------------
+def upgrade_entry(entry: Dict[str, Any]) -> DirectoryInfo:
+    """
+    Convert an entry of an older index version, which lists its files as
+    {"name", "size"} objects, to the current layout.
+    """
+
+    directory = entry["directory"]
+    names = [f["name"] for f in entry["files"]]
+
+    return DirectoryInfo(
+        path=entry["path"],
+        directory=DirectoryMeta(
+            name=directory["name"],
+            file_count=directory["file_count"],
+            key=search_key(directory["name"]),
+        ),
+        files=FileColumns(
+            names=names,
+            sizes=[f["size"] for f in entry["files"]],
+            keys=[search_key(name) for name in names],
+        ),
+    )
+
+
+# --------------------------------------------------
+@contextlib.contextmanager
+def open_index(index_path: str) -> Iterator[BinaryIO]:
+    """Open an index file for binary reading, decompressing .zst indexes."""
+
+    with open(index_path, "rb") as raw:
+        if not index_path.endswith(".zst"):
+            yield raw
+            return
+
+        # Every scan appends its own zstd frame, so read across all of them.
+        decompressor = require_zstandard().ZstdDecompressor()
+        reader = decompressor.stream_reader(raw, read_across_frames=True, closefd=False)
+        # BufferedReader adds the readline() and line iteration used here.
+        with io.BufferedReader(reader) as fh:
+            yield fh
+
+
+# --------------------------------------------------
+def index_writer(raw: BinaryIO, index_path: str) -> ContextManager[BinaryIO]:
+    """
+    Wrap a file opened for binary writing so that .zst indexes are written
+    as a zstd frame, finished when the context exits. The file itself is left
+    open.
+    """
+
+    if not index_path.endswith(".zst"):
+        return contextlib.nullcontext(raw)
+    compressor = require_zstandard().ZstdCompressor(level=ZSTD_LEVEL)
+    return compressor.stream_writer(raw, closefd=False)
+
+
+# --------------------------------------------------
+def require_zstandard():
+    """Return the zstandard module, failing clearly when it is not installed."""
+
+    if zstandard is None:
+        raise RuntimeError("the zstandard package is required for .zst indexes")
+    return zstandard
+
+
+# --------------------------------------------------
+def rewrite_index(index_path: str):
+    """Rewrite an index file in place using the current format."""
+
+    tmp_path = index_path + ".tmp"
+    try:
+        with (
+            open_index(index_path) as src,
+            open(tmp_path, "wb") as raw,
+            index_writer(raw, index_path) as dst,
+        ):
+            dst.write(dumps_json(IndexHeader(INDEX_VERSION)) + b"\n")
+            for entry in iter_index(src):
+                dst.write(dumps_json(entry) + b"\n")
+        os.replace(tmp_path, index_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# --------------------------------------------------
+def search_key(name: str) -> str:
+    """Return the NFC-normalized, lowercased form of a name used for matching."""
+
+    return normalize(name).lower()
+
+
 # --------------------------------------------------
 def normalize(s: str) -> str:
     """